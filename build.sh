@@ -4,6 +4,9 @@ set -e
 echo "Building Angular frontend..."
 cd frontend
 
+# This build does not write a manifest, so drop any stale one
+rm -f dist/build-manifest.json
+
 # Install dependencies if needed
 if [ ! -d "node_modules" ]; then
     echo "Installing npm dependencies..."
@@ -2,12 +2,24 @@
 """
 Build and deployment script for the Local Landmarks Map application
 This script handles Angular frontend building and deployment preparation
+Dependency installs and builds are skipped when their inputs are unchanged
+(pass --force to rebuild everything)
 """
 import os
 import subprocess
 import sys
 import logging
 import shutil
+import time
+
+from build_cache import (
+    build_fingerprint,
+    dependencies_fingerprint,
+    hash_output,
+    load_manifest,
+    verify_manifest,
+    write_manifest,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -160,30 +172,79 @@ def verify_build():
     logger.info("Build verification passed")
     return True
 
+def dependencies_reusable(manifest, deps_fingerprint):
+    """Check if the installed node_modules matches the current dependency inputs"""
+    node_modules = os.path.join(os.getcwd(), 'frontend', 'node_modules')
+    if not manifest or not os.path.isdir(node_modules):
+        return False
+    return manifest.get('dependencies', {}).get('fingerprint') == deps_fingerprint
+
+def build_reusable(manifest, build_fp):
+    """Check if the existing dist output matches the current build inputs"""
+    if not manifest or manifest.get('build', {}).get('fingerprint') != build_fp:
+        return False
+    return verify_manifest(manifest, check_hashes=True)
+
 def main():
     """Main build and deployment function"""
     logger.info("Starting build and deployment process...")
     
+    force = '--force' in sys.argv[1:]
+    manifest = None if force else load_manifest()
+    
     # Check prerequisites
     if not check_node_and_npm():
         logger.error("Node.js/npm check failed")
         return False
     
-    # Install dependencies
-    if not install_frontend_dependencies():
+    # Install dependencies unless the lockfile is unchanged
+    deps_fingerprint = dependencies_fingerprint()
+    deps_reused = dependencies_reusable(manifest, deps_fingerprint)
+    start = time.monotonic()
+    if deps_reused:
+        logger.info("Dependency inputs unchanged - reusing existing node_modules")
+    elif not install_frontend_dependencies():
         logger.error("Failed to install frontend dependencies")
         return False
+    else:
+        # npm install creates or rewrites package-lock.json, so record what was installed
+        deps_fingerprint = dependencies_fingerprint()
+    deps_duration = time.monotonic() - start
     
-    # Build frontend
-    if not build_angular_frontend():
+    # Build frontend unless the sources and dependencies are unchanged
+    build_fp = build_fingerprint(deps_fingerprint)
+    build_reused = build_reusable(manifest, build_fp)
+    start = time.monotonic()
+    if build_reused:
+        logger.info("Build inputs unchanged - reusing existing dist output")
+    elif not build_angular_frontend():
         logger.error("Failed to build Angular frontend")
         return False
+    build_duration = time.monotonic() - start
     
     # Verify build
     if not verify_build():
         logger.error("Build verification failed")
         return False
     
+    write_manifest({
+        'dependencies': {
+            'fingerprint': deps_fingerprint,
+            'reused': deps_reused,
+            'duration': round(deps_duration, 3)
+        },
+        'build': {
+            'fingerprint': build_fp,
+            'reused': build_reused,
+            'duration': round(build_duration, 3)
+        },
+        'output': {
+            'files': hash_output()
+        }
+    })
+    
+    logger.info(f"Dependencies: {'reused' if deps_reused else 'installed'} in {deps_duration:.1f}s, "
+                f"build: {'reused' if build_reused else 'rebuilt'} in {build_duration:.1f}s")
     logger.info("Build and deployment preparation completed successfully!")
     return True
 
@@ -0,0 +1,156 @@
+"""
+Content-hash build cache for the Angular frontend
+Fingerprints the dependency and source inputs so the build scripts can reuse
+an existing node_modules and dist output, and records the result in a manifest
+that the Flask app verifies before serving the frontend
+"""
+import os
+import json
+import hashlib
+import logging
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Inputs that decide whether node_modules can be reused, relative to frontend/.
+# frontend/package-lock.json is not checked in; the first `npm install` writes
+# it, and the fingerprint is taken after installing so it is always included.
+# The root package-lock.json belongs to the workspace package, not the frontend.
+DEPENDENCY_INPUTS = ['package.json', 'package-lock.json']
+
+# Inputs that decide whether the dist output can be reused
+BUILD_INPUTS = ['src', 'angular.json', 'tsconfig.json', 'tsconfig.app.json']
+
+def get_frontend_dir() -> str:
+    """Get the absolute path to the Angular project directory"""
+    return os.path.abspath(os.path.join(os.getcwd(), 'frontend'))
+
+def get_dist_path() -> str:
+    """Get the absolute path to the Angular build directory"""
+    return os.path.join(get_frontend_dir(), 'dist', 'landmarks-map')
+
+def get_manifest_path() -> str:
+    """Get the path of the build manifest (kept outside the served directory)"""
+    return os.path.join(get_frontend_dir(), 'dist', 'build-manifest.json')
+
+def _iter_files(base_dir: str, paths: List[str]) -> List[str]:
+    """List the files under the given paths, relative to base_dir and sorted"""
+    files = []
+    for path in paths:
+        full_path = os.path.join(base_dir, path)
+        if os.path.isfile(full_path):
+            files.append(path)
+        elif os.path.isdir(full_path):
+            for root, _, names in os.walk(full_path):
+                for name in names:
+                    files.append(os.path.relpath(os.path.join(root, name), base_dir))
+    return sorted(f.replace(os.sep, '/') for f in files)
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a single file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_paths(base_dir: str, paths: List[str]) -> str:
+    """
+    Fingerprint a set of files and directories
+
+    Both the relative file names and their contents are hashed, so renames,
+    additions and deletions change the fingerprint too.
+    """
+    digest = hashlib.sha256()
+    for rel_path in _iter_files(base_dir, paths):
+        digest.update(rel_path.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(hash_file(os.path.join(base_dir, rel_path)).encode('ascii'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def dependencies_fingerprint() -> str:
+    """Fingerprint of the npm dependency inputs"""
+    return hash_paths(get_frontend_dir(), DEPENDENCY_INPUTS)
+
+def build_fingerprint(deps_fingerprint: str) -> str:
+    """Fingerprint of the build inputs, including the dependency fingerprint"""
+    digest = hashlib.sha256()
+    digest.update(deps_fingerprint.encode('ascii'))
+    digest.update(hash_paths(get_frontend_dir(), BUILD_INPUTS).encode('ascii'))
+    return digest.hexdigest()
+
+def hash_output() -> Dict[str, Dict]:
+    """Record the size and hash of every file in the dist output"""
+    dist_path = get_dist_path()
+    return {
+        rel_path: {
+            'size': os.path.getsize(os.path.join(dist_path, rel_path)),
+            'sha256': hash_file(os.path.join(dist_path, rel_path))
+        }
+        for rel_path in _iter_files(dist_path, ['.'])
+    }
+
+def load_manifest() -> Optional[Dict]:
+    """Load the build manifest, or None if it is missing or unreadable"""
+    manifest_path = get_manifest_path()
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable build manifest: {e}")
+        return None
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        logger.warning("Ignoring build manifest with unsupported version")
+        return None
+    return manifest
+
+def write_manifest(manifest: Dict) -> None:
+    """Write the build manifest next to the dist output"""
+    manifest_path = get_manifest_path()
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    manifest = dict(manifest, version=MANIFEST_VERSION, created_at=time.time())
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    logger.info(f"Build manifest written to {manifest_path}")
+
+def verify_manifest(manifest: Optional[Dict], check_hashes: bool = False) -> bool:
+    """
+    Check that the dist output described by the manifest is present
+
+    index.html is always compared by content; other files are compared by
+    size unless check_hashes is set.
+
+    Args:
+        manifest: Manifest as returned by load_manifest
+        check_hashes: Also compare the contents of every other file
+
+    Returns:
+        True if index.html is listed and every listed file matches
+    """
+    if not manifest:
+        return False
+
+    files = manifest.get('output', {}).get('files', {})
+    if 'index.html' not in files:
+        return False
+
+    dist_path = get_dist_path()
+    for rel_path, info in files.items():
+        full_path = os.path.join(dist_path, rel_path)
+        try:
+            if os.path.getsize(full_path) != info['size']:
+                return False
+        except OSError:
+            return False
+        if (check_hashes or rel_path == 'index.html') and hash_file(full_path) != info['sha256']:
+            return False
+    return True
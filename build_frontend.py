@@ -2,11 +2,22 @@
 """
 Build script for Angular frontend
 This script builds the Angular frontend for deployment
+The build is skipped when its inputs are unchanged (pass --force to rebuild)
 """
 import os
 import subprocess
 import sys
 import logging
+import time
+
+from build_cache import (
+    build_fingerprint,
+    dependencies_fingerprint,
+    hash_output,
+    load_manifest,
+    verify_manifest,
+    write_manifest,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -60,6 +71,48 @@ def build_angular_frontend():
         logger.error(f"Error during Angular build: {e}")
         return False
 
+def main():
+    """Build the frontend unless the existing output already matches its inputs"""
+    force = '--force' in sys.argv[1:]
+    previous_manifest = load_manifest()
+    manifest = None if force else previous_manifest
+    
+    # This script does not install dependencies, so the build is tied to the
+    # node_modules recorded by the last install rather than the live lockfile
+    installed_deps = (previous_manifest or {}).get('dependencies', {}).get('fingerprint')
+    if installed_deps != dependencies_fingerprint():
+        logger.warning("node_modules may not match package-lock.json - run build_and_deploy.py to reinstall")
+        installed_deps = None
+    
+    build_fp = build_fingerprint(installed_deps) if installed_deps else None
+    build_reused = (
+        manifest is not None
+        and build_fp is not None
+        and manifest.get('build', {}).get('fingerprint') == build_fp
+        and verify_manifest(manifest, check_hashes=True)
+    )
+    
+    start = time.monotonic()
+    if build_reused:
+        logger.info("Build inputs unchanged - reusing existing dist output")
+    elif not build_angular_frontend():
+        return False
+    build_duration = time.monotonic() - start
+    
+    # Dependencies are not installed here, so keep whatever the last install recorded
+    write_manifest({
+        'dependencies': (previous_manifest or {}).get('dependencies', {}),
+        'build': {
+            'fingerprint': build_fp,
+            'reused': build_reused,
+            'duration': round(build_duration, 3)
+        },
+        'output': {
+            'files': hash_output()
+        }
+    })
+    return True
+
 if __name__ == "__main__":
-    success = build_angular_frontend()
+    success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -4,7 +4,8 @@ import 'leaflet.markercluster';
 
 import { LandmarksService } from '../../services/landmarks.service';
 import { GeolocationService, GeolocationPosition } from '../../services/geolocation.service';
-import { Landmark, LandmarkBounds } from '../../models/landmark.interface';
+import { Landmark, LandmarkBounds, LandmarksDelta } from '../../models/landmark.interface';
+import { LANDMARK_CATEGORIES } from '../../models/landmark-categories';
 
 @Component({
   selector: 'app-map',
@@ -18,8 +19,14 @@ export class MapComponent implements OnInit, AfterViewInit {
   private map!: L.Map;
   private markersGroup!: L.MarkerClusterGroup;
   private currentLandmarks: Landmark[] = [];
+  private markersByPageid = new Map<number, L.Marker>();
+  // Every category's landmarks for the viewport they were fetched for, so switching
+  // category costs at most one batch request per viewport
+  private categoryCache: { bounds: LandmarkBounds; landmarks: Map<string, Landmark[]> } | null = null;
   private isLoading = false;
   private currentCategory = 'all';
+  // Most notable landmarks shown per viewport, spread across the map by the server
+  private readonly maxLandmarks = 50;
 
   isLoadingVisible = false;
   isErrorVisible = false;
@@ -32,6 +39,9 @@ export class MapComponent implements OnInit, AfterViewInit {
   ) {}
 
   ngOnInit(): void {
+    // The store outlives this component; start from an empty one to match the empty map
+    this.landmarksService.resetStore();
+
     // Fix for default markers in Leaflet
     delete (L.Icon.Default.prototype as any)._getIconUrl;
     L.Icon.Default.mergeOptions({
@@ -96,42 +106,86 @@ export class MapComponent implements OnInit, AfterViewInit {
     this.isLoading = true;
     this.isLoadingVisible = true;
 
-    const bounds = this.map.getBounds();
-    const landmarkBounds: LandmarkBounds = {
-      north: bounds.getNorth(),
-      south: bounds.getSouth(),
-      east: bounds.getEast(),
-      west: bounds.getWest()
-    };
-
-    this.landmarksService.getLandmarks(landmarkBounds, this.currentCategory).subscribe({
-      next: (response) => {
-        this.displayLandmarks(response.landmarks);
+    this.landmarksService.updateLandmarks(this.getLandmarkBounds(), this.currentCategory, this.maxLandmarks).subscribe({
+      next: (delta) => {
+        this.displayLandmarks(delta);
         this.isLoading = false;
         this.isLoadingVisible = false;
       },
-      error: (error) => {
-        console.error('Error loading landmarks:', error);
-        this.showError('Failed to load landmarks: ' + error.message);
+      error: (error) => this.onLoadError(error)
+    });
+  }
+
+  private loadCategoryLandmarks(): void {
+    const landmarkBounds = this.getLandmarkBounds();
+    const cache = this.categoryCache;
+    if (cache && this.sameBounds(cache.bounds, landmarkBounds)) {
+      this.displayLandmarks(this.landmarksService.replaceLandmarks(cache.landmarks.get(this.currentCategory) || []));
+      return;
+    }
+
+    if (this.isLoading) return;
+
+    this.isLoading = true;
+    this.isLoadingVisible = true;
+
+    const categories = LANDMARK_CATEGORIES.map(category => category.value);
+    this.landmarksService.getLandmarksByCategory(landmarkBounds, categories, this.maxLandmarks).subscribe({
+      next: (landmarks) => {
+        this.categoryCache = { bounds: landmarkBounds, landmarks };
+        this.displayLandmarks(this.landmarksService.replaceLandmarks(landmarks.get(this.currentCategory) || []));
         this.isLoading = false;
         this.isLoadingVisible = false;
-      }
+      },
+      error: (error) => this.onLoadError(error)
     });
   }
 
-  private displayLandmarks(landmarks: Landmark[]): void {
-    // Clear existing markers
-    this.markersGroup.clearLayers();
-    this.currentLandmarks = landmarks;
+  private onLoadError(error: any): void {
+    console.error('Error loading landmarks:', error);
+    this.showError('Failed to load landmarks: ' + error.message);
+    this.isLoading = false;
+    this.isLoadingVisible = false;
+  }
 
-    // Update landmark count
-    this.landmarkCount = landmarks.length;
-    this.landmarkCountChanged.emit(landmarks.length);
+  private getLandmarkBounds(): LandmarkBounds {
+    const bounds = this.map.getBounds();
+    return {
+      north: bounds.getNorth(),
+      south: bounds.getSouth(),
+      east: bounds.getEast(),
+      west: bounds.getWest()
+    };
+  }
 
-    landmarks.forEach(landmark => {
+  private sameBounds(a: LandmarkBounds, b: LandmarkBounds): boolean {
+    return a.north === b.north && a.south === b.south && a.east === b.east && a.west === b.west;
+  }
+
+  private displayLandmarks(delta: LandmarksDelta): void {
+    // Drop markers for landmarks that left the view, keep the rest in place
+    const removedMarkers: L.Marker[] = [];
+    delta.removed.forEach(pageid => {
+      const marker = this.markersByPageid.get(pageid);
+      if (marker) {
+        removedMarkers.push(marker);
+        this.markersByPageid.delete(pageid);
+      }
+    });
+    this.markersGroup.removeLayers(removedMarkers);
+
+    const addedMarkers = delta.added.map(landmark => {
       const marker = this.createLandmarkMarker(landmark);
-      this.markersGroup.addLayer(marker);
+      this.markersByPageid.set(landmark.pageid!, marker);
+      return marker;
     });
+    this.markersGroup.addLayers(addedMarkers);
+
+    this.currentLandmarks = delta.landmarks;
+
+    // Update landmark count
+    this.landmarkCount = delta.landmarks.length;
+    this.landmarkCountChanged.emit(delta.landmarks.length);
   }
 
   private createLandmarkMarker(landmark: Landmark): L.Marker {
@@ -174,12 +228,13 @@ export class MapComponent implements OnInit, AfterViewInit {
   }
 
   onRefreshRequested(): void {
+    this.categoryCache = null;
     this.loadLandmarks();
   }
 
   onCategoryChanged(category: string): void {
     this.currentCategory = category;
-    this.loadLandmarks();
+    this.loadCategoryLandmarks();
   }
 
   private showError(message: string): void {
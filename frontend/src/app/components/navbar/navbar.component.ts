@@ -1,5 +1,6 @@
 import { Component, EventEmitter, Output } from '@angular/core';
 import { GeolocationService, GeolocationPosition } from '../../services/geolocation.service';
+import { LANDMARK_CATEGORIES } from '../../models/landmark-categories';
 
 @Component({
   selector: 'app-navbar',
@@ -16,16 +17,7 @@ export class NavbarComponent {
   isLocating = false;
   selectedCategory = 'all';
   
-  categories = [
-    { value: 'all', label: 'All Landmarks' },
-    { value: 'museums', label: 'Museums & Galleries' },
-    { value: 'churches', label: 'Churches & Religious' },
-    { value: 'monuments', label: 'Monuments & Memorials' },
-    { value: 'parks', label: 'Parks & Gardens' },
-    { value: 'buildings', label: 'Historic Buildings' },
-    { value: 'entertainment', label: 'Entertainment' },
-    { value: 'transport', label: 'Transportation' }
-  ];
+  categories = LANDMARK_CATEGORIES;
 
   constructor(private geolocationService: GeolocationService) {
     this.geolocationService.isLocating$.subscribe(isLocating => {
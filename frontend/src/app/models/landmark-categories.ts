@@ -0,0 +1,15 @@
+export interface LandmarkCategory {
+  value: string;
+  label: string;
+}
+
+export const LANDMARK_CATEGORIES: LandmarkCategory[] = [
+  { value: 'all', label: 'All Landmarks' },
+  { value: 'museums', label: 'Museums & Galleries' },
+  { value: 'churches', label: 'Churches & Religious' },
+  { value: 'monuments', label: 'Monuments & Memorials' },
+  { value: 'parks', label: 'Parks & Gardens' },
+  { value: 'buildings', label: 'Historic Buildings' },
+  { value: 'entertainment', label: 'Entertainment' },
+  { value: 'transport', label: 'Transportation' }
+];
@@ -6,6 +6,7 @@ export interface LandmarkBounds {
 }
 
 export interface Landmark {
+  pageid?: number;
   lat: number;
   lon: number;
   title: string;
@@ -13,8 +14,26 @@ export interface Landmark {
   url: string;
   thumbnail?: string;
   categories?: string[];
+  importance?: number;
 }
 
 export interface LandmarksResponse {
   landmarks: Landmark[];
+  removed?: number[];
+  delta?: boolean;
+}
+
+export interface LandmarkBatchResult {
+  pageids: number[];
+}
+
+export interface LandmarksBatchResponse {
+  landmarks: { [pageid: string]: Landmark };
+  results: LandmarkBatchResult[];
+}
+
+export interface LandmarksDelta {
+  added: Landmark[];
+  removed: number[];
+  landmarks: Landmark[];
 }
\ No newline at end of file
@@ -1,18 +1,27 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
+import { map } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
-import { LandmarkBounds, LandmarksResponse } from '../models/landmark.interface';
+import {
+  LandmarkBounds,
+  Landmark,
+  LandmarksBatchResponse,
+  LandmarksDelta,
+  LandmarksResponse
+} from '../models/landmark.interface';
 
 @Injectable({
   providedIn: 'root'
 })
 export class LandmarksService {
   private apiUrl = environment.apiUrl;
+  // Landmarks the client currently holds, keyed by pageid
+  private store = new Map<number, Landmark>();
 
   constructor(private http: HttpClient) { }
 
-  getLandmarks(bounds: LandmarkBounds, category?: string): Observable<LandmarksResponse> {
+  getLandmarks(bounds: LandmarkBounds, category?: string, limit?: number, known?: number[]): Observable<LandmarksResponse> {
     let params = new HttpParams()
       .set('north', bounds.north.toString())
       .set('south', bounds.south.toString())
@@ -23,6 +32,78 @@ export class LandmarksService {
       params = params.set('category', category);
     }
 
+    if (limit) {
+      params = params.set('limit', limit.toString());
+    }
+
+    if (known) {
+      params = params.set('known', known.join(','));
+    }
+
     return this.http.get<LandmarksResponse>(`${this.apiUrl}/landmarks`, { params });
   }
+
+  /**
+   * Fetch one viewport for several categories in a single batch request.
+   * The server searches the viewport once and shares details lookups across categories.
+   */
+  getLandmarksByCategory(bounds: LandmarkBounds, categories: string[], limit?: number): Observable<Map<string, Landmark[]>> {
+    const body = {
+      queries: categories.map(category => ({
+        ...bounds,
+        categories: category === 'all' ? [] : [category],
+        limit
+      }))
+    };
+
+    return this.http.post<LandmarksBatchResponse>(`${this.apiUrl}/landmarks/batch`, body).pipe(
+      map(response => new Map(categories.map((category, index): [string, Landmark[]] => [
+        category,
+        response.results[index].pageids.map(pageid => response.landmarks[pageid.toString()])
+      ])))
+    );
+  }
+
+  /** Replace the held landmarks with a full list, returning the difference to apply. */
+  replaceLandmarks(landmarks: Landmark[]): LandmarksDelta {
+    const next = new Map<number, Landmark>();
+    landmarks.forEach(landmark => {
+      if (landmark.pageid !== undefined) {
+        next.set(landmark.pageid, landmark);
+      }
+    });
+
+    const removed = Array.from(this.store.keys()).filter(pageid => !next.has(pageid));
+    const added = Array.from(next.values()).filter(landmark => !this.store.has(landmark.pageid!));
+    this.store = next;
+
+    return { added, removed, landmarks: Array.from(next.values()) };
+  }
+
+  /** Forget all held landmarks, e.g. when a new map starts without markers. */
+  resetStore(): void {
+    this.store.clear();
+  }
+
+  /**
+   * Fetch only what changed since the last update and apply it to the local store.
+   * The server skips landmarks the store already holds and lists the ones to drop.
+   */
+  updateLandmarks(bounds: LandmarkBounds, category?: string, limit?: number): Observable<LandmarksDelta> {
+    const known = Array.from(this.store.keys());
+
+    return this.getLandmarks(bounds, category, limit, known).pipe(
+      map(response => {
+        const removed = response.delta ? (response.removed || []) : known;
+        removed.forEach(pageid => this.store.delete(pageid));
+
+        const added = response.landmarks.filter(landmark =>
+          landmark.pageid !== undefined && !this.store.has(landmark.pageid)
+        );
+        added.forEach(landmark => this.store.set(landmark.pageid!, landmark));
+
+        return { added, removed, landmarks: Array.from(this.store.values()) };
+      })
+    );
+  }
 }
\ No newline at end of file
@@ -1,5 +1,8 @@
 #!/bin/bash
 cd frontend
+
+# This build does not write a manifest, so drop any stale one
+rm -f dist/build-manifest.json
 echo "Starting Angular build..."
 ng build --output-path=dist/landmarks-map --optimization=false --build-optimizer=false --aot=false --source-map=false --vendor-chunk=false --named-chunks=false --extract-licenses=false --progress=false > /dev/null 2>&1 &
 BUILD_PID=$!
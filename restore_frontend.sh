@@ -9,6 +9,7 @@ sleep 2
 
 # Clean and recreate dist directory
 rm -rf dist/landmarks-map
+rm -f dist/build-manifest.json  # this build does not write a manifest
 mkdir -p dist/landmarks-map
 
 # Create a minimal index.html with the new category filter components
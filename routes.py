@@ -1,21 +1,93 @@
 from flask import jsonify, request, send_from_directory
 from app import app, cache
 from wikipedia_service import WikipediaService
+from build_cache import get_dist_path, get_manifest_path, load_manifest, verify_manifest
 import logging
 import os
 import hashlib
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the number of queries accepted by the batch endpoint, so that
+# every query's base search fits in one request's geosearch budget
+MAX_BATCH_QUERIES = WikipediaService.MAX_SEARCH_CALLS
+
+# Upper bound on the number of landmarks a single query may ask for
+MAX_LANDMARKS_LIMIT = 200
+
+# Upper bound on the number of pageids a client may report as already known.
+# A client never holds more than one query's worth of landmarks, and the list
+# has to fit in a request line (gunicorn rejects lines over 4094 bytes).
+MAX_KNOWN_PAGEIDS = MAX_LANDMARKS_LIMIT
+
+def safe_float(value, default=0):
+    """Convert to float with NaN protection"""
+    if isinstance(value, str) and value.lower() in ('nan', '+nan', '-nan', 'inf', '+inf', '-inf'):
+        raise ValueError(f"Invalid numeric value: {value}")
+    result = float(value) if value is not None else default
+    if not (result == result):  # NaN check (NaN != NaN)
+        raise ValueError("NaN values not allowed")
+    return result
+
+def valid_bounds(north, south, east, west):
+    """Check that a bounding box lies within valid coordinate ranges"""
+    return -90 <= south <= north <= 90 and -180 <= west <= east <= 180
+
+def parse_limit(value):
+    """Parse an optional result limit, raising ValueError if it is out of range"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid limit: {value}")
+    limit = int(value)
+    if not 1 <= limit <= MAX_LANDMARKS_LIMIT:
+        raise ValueError(f"Limit out of range: {limit}")
+    return limit
+
+def parse_known_pageids(value):
+    """Parse a comma-separated list of pageids the client already has"""
+    if value is None:
+        return None
+    pageids = {int(pageid) for pageid in value.split(',') if pageid.strip()}
+    if len(pageids) > MAX_KNOWN_PAGEIDS:
+        raise ValueError(f"Too many known pageids: {len(pageids)}")
+    return pageids
+
+# Manifest (mtime, size) and verification result from the last build check
+_angular_build_check = None
+
 def get_angular_dist_path():
     """Get the absolute path to the Angular build directory"""
-    return os.path.abspath(os.path.join(os.getcwd(), 'frontend', 'dist', 'landmarks-map'))
+    return get_dist_path()
 
 def check_angular_build():
-    """Check if Angular build exists and contains index.html"""
-    dist_path = get_angular_dist_path()
-    index_path = os.path.join(dist_path, 'index.html')
-    return os.path.exists(dist_path) and os.path.exists(index_path)
+    """
+    Check if the Angular build is available
+    The dist output is verified against the manifest written by the build
+    scripts; a manifest that does not match counts as a missing build. The
+    result is cached until the manifest file changes. Builds made without a
+    manifest (the shell scripts and `npm run build` remove any stale one) are
+    accepted if index.html exists.
+    """
+    global _angular_build_check
+    try:
+        stat = os.stat(get_manifest_path())
+    except OSError:
+        return os.path.exists(os.path.join(get_angular_dist_path(), 'index.html'))
+    
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _angular_build_check is not None and _angular_build_check[0] == signature:
+        return _angular_build_check[1]
+    
+    manifest = load_manifest()
+    verified = verify_manifest(manifest)
+    if verified:
+        logger.info(f"Angular build verified from manifest (build {(manifest.get('build', {}).get('fingerprint') or '')[:12]})")
+    else:
+        logger.error("Angular build does not match its build manifest. Rebuild the frontend.")
+    
+    _angular_build_check = (signature, verified)
+    return verified
 
 @app.route('/')
 def index():
@@ -53,35 +125,52 @@ def get_landmarks():
     """
     API endpoint to fetch landmarks based on map bounds
     Expects query parameters: north, south, east, west (coordinates)
+    Optional: category, limit (maximum number of landmarks, ranked by importance),
+    known (comma-separated pageids the client already has; only changes are returned)
     """
     try:
         # Get bounding box coordinates from query parameters with NaN protection
-        def safe_float(value, default=0):
-            """Convert to float with NaN protection"""
-            if isinstance(value, str) and value.lower() in ('nan', '+nan', '-nan', 'inf', '+inf', '-inf'):
-                raise ValueError(f"Invalid numeric value: {value}")
-            result = float(value) if value is not None else default
-            if not (result == result):  # NaN check (NaN != NaN)
-                raise ValueError("NaN values not allowed")
-            return result
-        
         north = safe_float(request.args.get('north'), 0)
         south = safe_float(request.args.get('south'), 0)
         east = safe_float(request.args.get('east'), 0)
         west = safe_float(request.args.get('west'), 0)
         category_filter = request.args.get('category')
         
-        logger.debug(f"Fetching landmarks for bounds: N:{north}, S:{south}, E:{east}, W:{west}, Category:{category_filter}")
+        try:
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': f'Limit must be an integer between 1 and {MAX_LANDMARKS_LIMIT}'}), 400
+        
+        try:
+            known_pageids = parse_known_pageids(request.args.get('known'))
+        except ValueError:
+            return jsonify({'error': f'Known must list at most {MAX_KNOWN_PAGEIDS} integer pageids'}), 400
+        
+        logger.debug(f"Fetching landmarks for bounds: N:{north}, S:{south}, E:{east}, W:{west}, Category:{category_filter}, Limit:{limit}")
         
         # Validate coordinates
-        if not (-90 <= south <= north <= 90) or not (-180 <= west <= east <= 180):
+        if not valid_bounds(north, south, east, west):
             return jsonify({'error': 'Invalid coordinates'}), 400
         
         # Get landmarks from Wikipedia
         wikipedia_service = WikipediaService()
-        landmarks = wikipedia_service.get_landmarks_in_bounds(north, south, east, west, category_filter)
+        landmarks = wikipedia_service.get_landmarks_in_bounds(north, south, east, west, category_filter, limit, known_pageids)
+        
+        # Report upstream failures rather than an empty result, which a delta
+        # client would take as "remove everything"
+        if landmarks is None:
+            return jsonify({'error': 'Failed to fetch landmarks'}), 500
         
         logger.debug(f"Found {len(landmarks)} landmarks")
+        
+        if known_pageids is not None:
+            # Delta response: only send records the client lacks, plus what to drop
+            current_pageids = {landmark['pageid'] for landmark in landmarks}
+            added = [landmark for landmark in landmarks if landmark['pageid'] not in known_pageids]
+            removed = sorted(known_pageids - current_pageids)
+            logger.debug(f"Delta response: {len(added)} added, {len(removed)} removed")
+            return jsonify({'landmarks': added, 'removed': removed, 'delta': True})
+        
         return jsonify({'landmarks': landmarks})
         
     except ValueError as e:
@@ -91,6 +180,79 @@ def get_landmarks():
         logger.error(f"Error fetching landmarks: {e}")
         return jsonify({'error': 'Failed to fetch landmarks'}), 500
 
+@app.route('/api/landmarks/batch', methods=['POST'])
+def get_landmarks_batch():
+    """
+    API endpoint to fetch landmarks for several viewports in one request
+    Expects a JSON body: {"queries": [{north, south, east, west, categories, limit}, ...]}
+    Returns a shared landmarks table keyed by pageid and per-query lists of pageids
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Expected a JSON object with a list of queries'}), 400
+        raw_queries = payload.get('queries')
+        
+        if not isinstance(raw_queries, list) or not raw_queries:
+            return jsonify({'error': 'Expected a non-empty list of queries'}), 400
+        if len(raw_queries) > MAX_BATCH_QUERIES:
+            return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries allowed per batch'}), 400
+        
+        queries = []
+        for raw_query in raw_queries:
+            if not isinstance(raw_query, dict):
+                return jsonify({'error': 'Invalid query format'}), 400
+            
+            north = safe_float(raw_query.get('north'), 0)
+            south = safe_float(raw_query.get('south'), 0)
+            east = safe_float(raw_query.get('east'), 0)
+            west = safe_float(raw_query.get('west'), 0)
+            if not valid_bounds(north, south, east, west):
+                return jsonify({'error': 'Invalid coordinates'}), 400
+            
+            categories = raw_query.get('categories') or []
+            if isinstance(categories, str):
+                categories = [categories]
+            if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+                return jsonify({'error': 'Invalid categories'}), 400
+            # 'all' means no filtering, same as the single-query endpoint
+            if 'all' in categories:
+                categories = []
+            categories = list(dict.fromkeys(c for c in categories if c))
+            
+            try:
+                limit = parse_limit(raw_query.get('limit'))
+            except ValueError:
+                return jsonify({'error': f'Limit must be an integer between 1 and {MAX_LANDMARKS_LIMIT}'}), 400
+            
+            queries.append({
+                'north': north,
+                'south': south,
+                'east': east,
+                'west': west,
+                'categories': categories,
+                'limit': limit
+            })
+        
+        logger.debug(f"Fetching landmarks for batch of {len(queries)} queries")
+        
+        wikipedia_service = WikipediaService()
+        result = wikipedia_service.get_landmarks_batch(queries)
+        
+        # Fail like the single-query endpoint rather than report empty areas
+        if result is None:
+            return jsonify({'error': 'Failed to fetch landmarks'}), 500
+        
+        logger.debug(f"Batch returned {len(result['landmarks'])} unique landmarks")
+        return jsonify(result)
+        
+    except (TypeError, ValueError) as e:
+        logger.error(f"Invalid batch query values: {e}")
+        return jsonify({'error': 'Invalid coordinate format'}), 400
+    except Exception as e:
+        logger.error(f"Error fetching landmark batch: {e}")
+        return jsonify({'error': 'Failed to fetch landmarks'}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors - serve Angular frontend for client-side routing"""
@@ -8,6 +8,7 @@ cd frontend
 
 # Clean any existing build
 rm -rf dist/landmarks-map
+rm -f dist/build-manifest.json  # this build does not write a manifest
 mkdir -p dist/landmarks-map
 
 # Install dependencies if needed
@@ -1,14 +1,38 @@
 import requests
 from requests.adapters import HTTPAdapter
 import logging
-from typing import List, Dict, Optional
+import math
+from typing import List, Dict, Optional, Set, Tuple
 import time
 
 logger = logging.getLogger(__name__)
 
+class WikipediaAPIError(requests.RequestException):
+    """Error reported by the MediaWiki API in the body of an HTTP 200 response"""
+
+def check_api_error(data: Dict) -> Dict:
+    """Raise WikipediaAPIError if an API response carries an error, else return it"""
+    if 'error' in data:
+        error = data['error']
+        raise WikipediaAPIError(f"{error.get('code', 'unknown')}: {error.get('info', '')}")
+    return data
+
 class WikipediaService:
     """Service class for interacting with Wikipedia APIs"""
     
+    # Number of geosearch hits used when no result limit is requested
+    DEFAULT_SEARCH_LIMIT = 50
+    # Maximum number of hits a single geosearch call may return
+    MAX_SEARCH_LIMIT = 500
+    # Viewports are split into GRID_SIZE x GRID_SIZE cells for result quotas
+    GRID_SIZE = 4
+    # Candidates per requested result whose details are fetched for category filtering
+    CATEGORY_POOL_FACTOR = 4
+    # Largest box searched by bounding box; the API rejects bigger boxes
+    MAX_BBOX_AREA_KM2 = 300
+    # Geosearch calls one service instance (one API request) may make
+    MAX_SEARCH_CALLS = 8
+    
     def __init__(self):
         self.base_url = "https://en.wikipedia.org/api/rest_v1"
         self.api_url = "https://en.wikipedia.org/w/api.php"
@@ -18,6 +42,8 @@ class WikipediaService:
         })
         # Cache for landmark details to avoid repeated API calls
         self._details_cache = {}
+        # Geosearch calls left for this request; cell refinement stops at zero
+        self._search_calls_left = self.MAX_SEARCH_CALLS
         # Connection pooling for better performance
         adapter = HTTPAdapter(
             pool_connections=10,
@@ -26,101 +52,500 @@ class WikipediaService:
         )
         self.session.mount('https://', adapter)
     
-    def get_landmarks_in_bounds(self, north: float, south: float, east: float, west: float, category_filter: Optional[str] = None) -> List[Dict]:
+    def get_landmarks_in_bounds(self, north: float, south: float, east: float, west: float, category_filter: Optional[str] = None, limit: Optional[int] = None, known_pageids: Optional[Set[int]] = None) -> Optional[List[Dict]]:
         """
         Fetch landmarks within the given bounding box using Wikipedia's geosearch API
         
         Args:
             north, south, east, west: Bounding box coordinates
             category_filter: Optional category to filter landmarks (e.g., 'museums', 'churches', 'monuments')
+            limit: Optional maximum number of landmarks; the most important ones
+                are kept, spread across the bounding box
+            known_pageids: Optional pageids the caller already has; without a
+                category filter their details are not fetched and they are
+                returned with pageid, title and coordinates only
             
         Returns:
-            List of landmark dictionaries with title, coordinates, description, etc.
+            List of landmark dictionaries with title, coordinates, description, etc.,
+            or None if the Wikipedia API could not be queried
         """
         try:
-            # Calculate center point and radius for the search
-            center_lat = (north + south) / 2
-            center_lon = (east + west) / 2
-            
-            # Calculate approximate radius in meters (rough estimation)
-            lat_diff = abs(north - south)
-            lon_diff = abs(east - west)
-            radius = max(lat_diff, lon_diff) * 111000 / 2  # Convert degrees to meters roughly
-            radius = min(radius, 10000)  # Cap at 10km to avoid too many results
-            radius = max(radius, 1000)   # Minimum 1km to ensure we get some results
-            
-            logger.debug(f"Searching around {center_lat}, {center_lon} with radius {radius}m")
+            bounds = (north, south, east, west)
+            filtered_pages = self._search_candidates(*bounds, limit)
             
-            # Search for pages near the location
-            params = {
-                'action': 'query',
-                'list': 'geosearch',
-                'gscoord': f"{center_lat}|{center_lon}",
-                'gsradius': int(radius),
-                'gslimit': 50,
-                'format': 'json'
-            }
+            # Without a category filter the selection can be made before fetching
+            # details, so only the returned landmarks cost a details lookup. With
+            # one, details are needed to filter, so they are fetched for a
+            # bounded, equally spread pool of the most important candidates.
+            if limit:
+                pool_size = limit * self.CATEGORY_POOL_FACTOR if category_filter else limit
+                filtered_pages = self._select_spread(filtered_pages, pool_size, *bounds)
             
-            response = self.session.get(self.api_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            # Pages the caller already has only need details for category filtering
+            skip_details = set(known_pageids or ()) if not category_filter else set()
             
-            if 'query' not in data or 'geosearch' not in data['query']:
-                logger.warning("No geosearch results found in Wikipedia response")
-                return []
+            # Batch process page details for better performance
+            page_details = self._get_page_details_batch(
+                [(p['pageid'], p['title']) for p in filtered_pages if p['pageid'] not in skip_details],
+                include_categories=True
+            )
             
             landmarks = []
-            pages = data['query']['geosearch']
-            filtered_pages = []
-            
-            # Filter results to only those within our bounding box
-            for page in pages:
-                lat = page.get('lat')
-                lon = page.get('lon')
-                
-                if (lat is not None and lon is not None and 
-                    south <= lat <= north and west <= lon <= east):
-                    
-                    # Collect pages for batch processing
-                    filtered_pages.append({
+            for page in filtered_pages:
+                if page['pageid'] in skip_details:
+                    landmarks.append({
                         'pageid': page['pageid'],
-                        'title': page['title'],
-                        'lat': lat,
-                        'lon': lon
+                        'lat': page['lat'],
+                        'lon': page['lon'],
+                        'title': page['title']
                     })
-            
-            # Batch process page details for better performance
-            if filtered_pages:
-                page_details = self._get_page_details_batch(
-                    [(p['pageid'], p['title']) for p in filtered_pages],
-                    include_categories=True
-                )
+                    continue
                 
-                for page in filtered_pages:
-                    pageid = page['pageid']
-                    if pageid in page_details:
-                        landmark_info = page_details[pageid].copy()
-                        landmark_info.update({
-                            'lat': page['lat'],
-                            'lon': page['lon'],
-                            'title': page['title']
-                        })
-                        
-                        # Apply category filter if specified
-                        if category_filter and not self._matches_category_filter(landmark_info, category_filter):
-                            continue
-                            
-                        landmarks.append(landmark_info)
+                landmark_info = self._build_landmark(page, page_details)
+                if landmark_info is None:
+                    continue
+                
+                # Apply category filter if specified
+                if category_filter and not self._matches_category_filter(landmark_info, category_filter):
+                    continue
+                    
+                landmarks.append(landmark_info)
+            
+            if limit and category_filter:
+                landmarks = self._select_spread(landmarks, limit, *bounds)
             
             logger.debug(f"Filtered to {len(landmarks)} landmarks within bounds")
             return landmarks
             
         except requests.RequestException as e:
             logger.error(f"Wikipedia API request failed: {e}")
-            return []
+            return None
+        except Exception as e:
+            logger.error(f"Error processing Wikipedia data: {e}")
+            return None
+    
+    def get_landmarks_batch(self, queries: List[Dict]) -> Optional[Dict]:
+        """
+        Fetch landmarks for several viewports and categories in one pass
+        
+        Queries with identical bounding boxes share one geosearch, and a limited
+        query whose box lies inside another limited query's box reuses that
+        search when it was complete (not capped). Other overlapping viewports
+        are still searched separately; only their details lookups are shared.
+        The pageids found across all queries are deduplicated into shared
+        details batches.
+        
+        Args:
+            queries: List of dictionaries with 'north', 'south', 'east', 'west',
+                'categories' (list of category filters, empty for all) and
+                optionally 'limit'
+            
+        Returns:
+            Dictionary with a shared 'landmarks' table keyed by pageid and a
+            per-query 'results' list referencing it by pageid, or None if the
+            Wikipedia API could not be queried
+        """
+        try:
+            return self._get_landmarks_batch(queries)
+        except requests.RequestException as e:
+            logger.error(f"Wikipedia API request failed: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error processing Wikipedia data: {e}")
+            return None
+    
+    def _get_landmarks_batch(self, queries: List[Dict]) -> Dict:
+        """Implementation of get_landmarks_batch, letting upstream errors propagate"""
+        search_keys = []
+        key_limits = {}
+        for query in queries:
+            bounds = (query['north'], query['south'], query['east'], query['west'])
+            limit = query.get('limit')
+            search_key = bounds + (bool(limit),)
+            search_keys.append(search_key)
+            key_limits[search_key] = max(key_limits.get(search_key, 0), limit or 0)
+        
+        # Search each distinct area once, largest first so that boxes inside a
+        # completely searched box can be answered from its results. Refinement
+        # of capped searches waits until every area has had its base search,
+        # so it only uses the budget left over.
+        def area(key):
+            return (key[0] - key[1]) * (key[2] - key[3])
+        
+        search_results = {}
+        complete_keys = []
+        saturated_keys = []
+        for search_key in sorted(dict.fromkeys(search_keys), key=area, reverse=True):
+            north, south, east, west, limited = search_key
+            if not limited:
+                search_results[search_key] = self._search_pages_in_bounds(north, south, east, west)
+                continue
+            
+            container = next((
+                key for key in complete_keys
+                if key[1] <= south and north <= key[0] and key[3] <= west and east <= key[2]
+            ), None)
+            if container is not None:
+                search_results[search_key] = [
+                    page for page in search_results[container]
+                    if south <= page['lat'] <= north and west <= page['lon'] <= east
+                ]
+                complete_keys.append(search_key)
+                continue
+            
+            pages, saturated = self._search_box(north, south, east, west)
+            search_results[search_key] = pages
+            (saturated_keys if saturated else complete_keys).append(search_key)
+        
+        for search_key in saturated_keys:
+            if self._search_calls_left <= 0:
+                break
+            search_results[search_key] = self._refine_cells(
+                search_results[search_key], key_limits[search_key], *search_key[:4]
+            )
+        
+        query_pages = []
+        for query, search_key in zip(queries, search_keys):
+            bounds = search_key[:4]
+            limit = query.get('limit')
+            pages = search_results[search_key]
+            # As for single queries, select before fetching details, keeping a
+            # larger pool when a category filter still has to be applied
+            if limit:
+                pool_size = limit * self.CATEGORY_POOL_FACTOR if query.get('categories') else limit
+                pages = self._select_spread(pages, pool_size, *bounds)
+            query_pages.append(pages)
+        
+        logger.debug(f"Batch of {len(queries)} queries used {self.MAX_SEARCH_CALLS - self._search_calls_left} searches")
+        
+        # Fetch details for the union of pages in one go
+        unique_pages = {}
+        for pages in query_pages:
+            for page in pages:
+                unique_pages.setdefault(page['pageid'], page)
+        
+        page_details = self._get_page_details_batch(
+            [(p['pageid'], p['title']) for p in unique_pages.values()],
+            include_categories=True
+        )
+        
+        landmarks = {}
+        results = []
+        for query, pages in zip(queries, query_pages):
+            categories = query.get('categories') or []
+            pageids = []
+            for page in pages:
+                pageid = page['pageid']
+                if pageid not in landmarks:
+                    landmark_info = self._build_landmark(page, page_details)
+                    if landmark_info is None:
+                        continue
+                    landmarks[pageid] = landmark_info
+                
+                # A landmark belongs to the query if it matches any requested category
+                if categories and not any(
+                    self._matches_category_filter(landmarks[pageid], category)
+                    for category in categories
+                ):
+                    continue
+                
+                pageids.append(pageid)
+            
+            limit = query.get('limit')
+            if limit and categories:
+                pageids = [
+                    landmark['pageid'] for landmark in self._select_spread(
+                        [landmarks[pageid] for pageid in pageids], limit,
+                        query['north'], query['south'], query['east'], query['west']
+                    )
+                ]
+            
+            results.append({'pageids': pageids})
+        
+        # Only return landmarks that at least one query references
+        referenced = {pageid for result in results for pageid in result['pageids']}
+        return {
+            'landmarks': {str(pageid): info for pageid, info in landmarks.items() if pageid in referenced},
+            'results': results
+        }
+    
+    def _search_candidates(self, north: float, south: float, east: float, west: float, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Collect candidate pages for a bounding box
+        
+        Without a limit this is the plain geosearch around the box center. With
+        a limit, the whole box is searched once; only if that search hits the
+        API's result cap are under-covered grid cells searched individually.
+        
+        Args:
+            north, south, east, west: Bounding box coordinates
+            limit: Optional maximum number of landmarks that will be selected
+            
+        Returns:
+            List of dictionaries with pageid, title, lat and lon (and
+            importance when a limit is given)
+        """
+        if not limit:
+            return self._search_pages_in_bounds(north, south, east, west)
+        
+        pages, saturated = self._search_box(north, south, east, west)
+        if saturated:
+            pages = self._refine_cells(pages, limit, north, south, east, west)
+        return pages
+    
+    def _refine_cells(self, pages: List[Dict], limit: int, north: float, south: float, east: float, west: float) -> List[Dict]:
+        """
+        Fill in grid cells that a capped bounding box search left under-covered
+        
+        A capped search favours pages near the box center. The four quadrants
+        are searched first; each of those is centered on the corner its four
+        grid cells share, so together they reach every cell. Any budget left
+        then goes to cells with fewer than twice their share of the limit,
+        emptiest first. Searches run one
+        after another and stop when the request's search budget is spent.
+        
+        Args:
+            pages: Candidates from the capped search of the whole box
+            limit: Maximum number of landmarks that will be selected
+            north, south, east, west: Bounding box coordinates
+            
+        Returns:
+            The candidates merged with those found in the refinement searches
+        """
+        candidates = {page['pageid']: page for page in pages}
+        
+        def search(box, search_limit):
+            found, _ = self._search_box(*box, search_limit)
+            for page in found:
+                candidates.setdefault(page['pageid'], page)
+        
+        mid_lat = (north + south) / 2
+        mid_lon = (east + west) / 2
+        quadrants = [
+            (north, mid_lat, mid_lon, west), (north, mid_lat, east, mid_lon),
+            (mid_lat, south, mid_lon, west), (mid_lat, south, east, mid_lon)
+        ]
+        for quadrant in quadrants:
+            if self._search_calls_left <= 0:
+                break
+            search(quadrant, self.MAX_SEARCH_LIMIT)
+        
+        grid = self.GRID_SIZE
+        lat_step = (north - south) / grid
+        lon_step = (east - west) / grid
+        wanted = 2 * math.ceil(limit / (grid * grid))
+        
+        counts = {}
+        for page in candidates.values():
+            key = self._grid_cell(page, north, south, east, west)
+            counts[key] = counts.get(key, 0) + 1
+        
+        sparse_cells = sorted(
+            ((row, col) for row in range(grid) for col in range(grid)
+             if counts.get((row, col), 0) < wanted),
+            key=lambda key: counts.get(key, 0)
+        )
+        for row, col in sparse_cells:
+            if self._search_calls_left <= 0:
+                break
+            search((south + (row + 1) * lat_step, south + row * lat_step,
+                    west + (col + 1) * lon_step, west + col * lon_step), self.DEFAULT_SEARCH_LIMIT)
+        
+        logger.debug(f"Refined capped search to {len(candidates)} candidates, {self._search_calls_left} searches left")
+        return list(candidates.values())
+    
+    def _search_box(self, north: float, south: float, east: float, west: float, search_limit: int = MAX_SEARCH_LIMIT) -> Tuple[List[Dict], bool]:
+        """
+        Search a bounding box for pages, returning their importance as well
+        
+        The importance score is the page length in bytes, which the 'info' prop
+        returns alongside the geosearch results at no extra cost.
+        
+        Args:
+            north, south, east, west: Box coordinates
+            search_limit: Maximum number of geosearch hits to request
+            
+        Returns:
+            Tuple of the pages inside the box (dictionaries with pageid, title,
+            lat, lon and importance) and whether the search hit search_limit
+        """
+        params = {
+            'action': 'query',
+            'generator': 'geosearch',
+            'ggslimit': search_limit,
+            'prop': 'coordinates|info',
+            'colimit': 'max',
+            'format': 'json'
+        }
+        
+        height_km = (north - south) * 111
+        width_km = (east - west) * 111 * math.cos(math.radians((north + south) / 2))
+        if height_km * width_km <= self.MAX_BBOX_AREA_KM2:
+            params['ggsbbox'] = f"{north}|{west}|{south}|{east}"
+        else:
+            # Too big for a bounding box search, fall back to a capped radius
+            params['ggscoord'] = f"{(north + south) / 2}|{(east + west) / 2}"
+            params['ggsradius'] = int(self._search_radius(north, south, east, west))
+        
+        data = self._search_request(params)
+        results = data.get('query', {}).get('pages', {})
+        
+        pages = []
+        for page in results.values():
+            coordinates = page.get('coordinates')
+            if not coordinates:
+                continue
+            
+            lat = coordinates[0].get('lat')
+            lon = coordinates[0].get('lon')
+            if (lat is not None and lon is not None and
+                south <= lat <= north and west <= lon <= east):
+                
+                pages.append({
+                    'pageid': page['pageid'],
+                    'title': page['title'],
+                    'lat': lat,
+                    'lon': lon,
+                    'importance': page.get('length', 0)
+                })
+        
+        return pages, len(results) >= search_limit
+    
+    def _search_request(self, params: Dict) -> Dict:
+        """Send a geosearch request, counting it against the request's search budget"""
+        self._search_calls_left -= 1
+        response = self.session.get(self.api_url, params=params, timeout=10)
+        response.raise_for_status()
+        return check_api_error(response.json())
+    
+    def _grid_cell(self, item: Dict, north: float, south: float, east: float, west: float) -> Tuple[int, int]:
+        """Row and column of the GRID_SIZE x GRID_SIZE cell an item falls in"""
+        grid = self.GRID_SIZE
+        lat_span = (north - south) or 1
+        lon_span = (east - west) or 1
+        row = min(grid - 1, max(0, int((item['lat'] - south) / lat_span * grid)))
+        col = min(grid - 1, max(0, int((item['lon'] - west) / lon_span * grid)))
+        return row, col
+    
+    def _search_radius(self, north: float, south: float, east: float, west: float) -> float:
+        """Approximate geosearch radius in meters covering a bounding box"""
+        lat_diff = abs(north - south)
+        lon_diff = abs(east - west)
+        radius = max(lat_diff, lon_diff) * 111000 / 2  # Convert degrees to meters roughly
+        radius = min(radius, 10000)  # Cap at 10km to avoid too many results
+        radius = max(radius, 1000)   # Minimum 1km to ensure we get some results
+        return radius
+    
+    def _search_pages_in_bounds(self, north: float, south: float, east: float, west: float) -> List[Dict]:
+        """
+        Run a geosearch around the bounding box and keep the pages inside it
+        
+        Args:
+            north, south, east, west: Bounding box coordinates
+            
+        Returns:
+            List of dictionaries with pageid, title, lat and lon
+        """
+        # Calculate center point and radius for the search
+        center_lat = (north + south) / 2
+        center_lon = (east + west) / 2
+        radius = self._search_radius(north, south, east, west)
+        
+        logger.debug(f"Searching around {center_lat}, {center_lon} with radius {radius}m")
+        
+        # Search for pages near the location
+        params = {
+            'action': 'query',
+            'list': 'geosearch',
+            'gscoord': f"{center_lat}|{center_lon}",
+            'gsradius': int(radius),
+            'gslimit': self.DEFAULT_SEARCH_LIMIT,
+            'format': 'json'
+        }
+        
+        data = self._search_request(params)
+        
+        if 'query' not in data or 'geosearch' not in data['query']:
+            logger.warning("No geosearch results found in Wikipedia response")
             return []
+        
+        filtered_pages = []
+        
+        # Filter results to only those within our bounding box
+        for page in data['query']['geosearch']:
+            lat = page.get('lat')
+            lon = page.get('lon')
+            
+            if (lat is not None and lon is not None and 
+                south <= lat <= north and west <= lon <= east):
+                
+                filtered_pages.append({
+                    'pageid': page['pageid'],
+                    'title': page['title'],
+                    'lat': lat,
+                    'lon': lon
+                })
+        
+        return filtered_pages
+    
+    def _build_landmark(self, page: Dict, page_details: Dict[int, Dict]) -> Optional[Dict]:
+        """
+        Combine a geosearch page with its fetched details
+        
+        Returns:
+            Landmark dictionary, or None if no details were fetched for the page
+        """
+        pageid = page['pageid']
+        if pageid not in page_details:
+            return None
+        
+        landmark_info = page_details[pageid].copy()
+        landmark_info.update({
+            'pageid': pageid,
+            'lat': page['lat'],
+            'lon': page['lon'],
+            'title': page['title']
+        })
+        return landmark_info
+    
+    def _select_spread(self, items: List[Dict], limit: int, north: float, south: float, east: float, west: float) -> List[Dict]:
+        """
+        Pick the most important items while spreading them across the bounding box
+        
+        The box is split into a GRID_SIZE x GRID_SIZE grid and each cell may
+        contribute an equal share of the limit. Slots left over by sparse cells
+        are then filled with the most important remaining items.
+        
+        Args:
+            items: Dictionaries with 'pageid', 'lat', 'lon' and 'importance'
+            limit: Maximum number of items to return
+            north, south, east, west: Bounding box coordinates
+            
+        Returns:
+            Selected items ordered by descending importance
+        """
+        def importance(item):
+            return item.get('importance', 0)
+        
+        ranked = sorted(items, key=importance, reverse=True)
+        if len(ranked) <= limit:
+            return ranked
+        
+        quota = math.ceil(limit / (self.GRID_SIZE * self.GRID_SIZE))
+        
+        cell_counts = {}
+        selected = []
+        leftovers = []
+        for item in ranked:
+            key = self._grid_cell(item, north, south, east, west)
+            if len(selected) < limit and cell_counts.get(key, 0) < quota:
+                cell_counts[key] = cell_counts.get(key, 0) + 1
+                selected.append(item)
+            else:
+                leftovers.append(item)
+        
+        selected.extend(leftovers[:limit - len(selected)])
+        return sorted(selected, key=importance, reverse=True)
     
     def _get_page_details_batch(self, page_list: List[tuple], include_categories: bool = False) -> Dict[int, Dict]:
         """
@@ -156,7 +581,7 @@ class WikipediaService:
             
             try:
                 # Include categories if requested
-                props = 'extracts|pageimages'
+                props = 'extracts|pageimages|info'
                 if include_categories:
                     props += '|categories'
                 
@@ -179,7 +604,7 @@ class WikipediaService:
                 
                 response = self.session.get(self.api_url, params=params, timeout=10)
                 response.raise_for_status()
-                data = response.json()
+                data = check_api_error(response.json())
                 
                 if 'query' in data and 'pages' in data['query']:
                     for pageid_str, page_data in data['query']['pages'].items():
@@ -190,7 +615,8 @@ class WikipediaService:
                             'description': page_data.get('extract', 'No description available.'),
                             'url': f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
                             'thumbnail': None,
-                            'categories': []
+                            'categories': [],
+                            'importance': page_data.get('length', 0)
                         }
                         
                         if 'thumbnail' in page_data: